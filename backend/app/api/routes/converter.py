@@ -1,39 +1,152 @@
 from fastapi import APIRouter, UploadFile, File
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import multiprocessing
 import tempfile
 import os
-from typing import List
 import shutil
 from datetime import timedelta
 import zipfile
 import io
 
+from app.core.config import settings
+from app.utils import decode_text
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/convert", tags=["converter"])
 
+_cpu_pool: ProcessPoolExecutor | None = None
+
+
+def start_cpu_pool() -> ProcessPoolExecutor:
+    """
+    Create the process pool used for batch conversions.
+    Workers are spawned rather than forked: the server process runs thread
+    pools and gRPC channel threads, which are unsafe to fork.
+    Any pool already running is shut down first.
+    """
+    global _cpu_pool
+    shutdown_cpu_pool()
+    _cpu_pool = ProcessPoolExecutor(
+        max_workers=settings.CONVERTER_POOL_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    return _cpu_pool
+
+
+def shutdown_cpu_pool() -> None:
+    """Shut down the batch conversion pool, if it was started."""
+    global _cpu_pool
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(cancel_futures=True)
+        _cpu_pool = None
+
+
+def _submit_conversion(
+    loop: asyncio.AbstractEventLoop, content: bytes
+) -> asyncio.Future[str | None]:
+    """Run _decode_and_convert on the pool, replacing it if a worker has died."""
+    cpu_pool = _cpu_pool if _cpu_pool is not None else start_cpu_pool()
+    try:
+        return loop.run_in_executor(cpu_pool, _decode_and_convert, content)
+    except BrokenProcessPool:
+        # A crashed or OOM-killed worker breaks the whole executor for good
+        cpu_pool = start_cpu_pool()
+        return loop.run_in_executor(cpu_pool, _decode_and_convert, content)
+
 def convert_srt_to_txt(srt_content: str) -> str:
     """Convert SRT content to plain text."""
-    lines = srt_content.split('\n')
     text_lines = []
-    current_text = ""
+    block: list[str] = []
     
-    for line in lines:
+    for line in srt_content.split('\n'):
         line = line.strip()
-        # Skip empty lines, subtitle numbers, and timestamp lines
-        if (not line or 
-            line.isdigit() or 
-            '-->' in line):
-            if current_text:
-                text_lines.append(current_text)
-                current_text = ""
+        # Empty lines, subtitle numbers, and timestamp lines end the current block
+        if not line or line.isdigit() or '-->' in line:
+            if block:
+                text_lines.append(' '.join(block))
+                block = []
             continue
         
-        current_text += " " + line if current_text else line
+        block.append(line)
     
-    if current_text:
-        text_lines.append(current_text)
+    if block:
+        text_lines.append(' '.join(block))
     
     return '\n'.join(text_lines)
 
+def _decode_and_convert(content: bytes) -> str | None:
+    """
+    Decode an uploaded SRT file and convert it to plain text.
+    Returns None if the text encoding cannot be detected.
+    """
+    srt_content = decode_text(content)
+    if srt_content is None:
+        return None
+    return convert_srt_to_txt(srt_content)
+
+class _ZipChunkWriter(io.RawIOBase):
+    """Write-only stream that collects ZIP bytes until the response drains them."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    # zipfile only writes bytes-like objects, narrower than typeshed's Buffer
+    def write(self, data: bytes | bytearray | memoryview) -> int:  # type: ignore[override]
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def _stream_zip(
+    first_member: tuple[str, str],
+    pending: deque[tuple[str, asyncio.Future[str | None]]],
+) -> AsyncIterator[bytes]:
+    """
+    Yield the ZIP archive member by member as each conversion finishes.
+    Members are popped off ``pending`` once written, so only conversions not
+    yet streamed stay in memory.
+    """
+    stream = _ZipChunkWriter()
+    try:
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr(*first_member)
+            del first_member
+            yield stream.drain()
+            while pending:
+                output_filename, txt_future = pending.popleft()
+                txt_content = await txt_future
+                del txt_future
+                if txt_content is None:
+                    raise ValueError(
+                        f"Could not detect the text encoding of {output_filename}"
+                    )
+                zip_file.writestr(output_filename, txt_content)
+                del txt_content
+                yield stream.drain()
+    except Exception:
+        # Headers are already sent; abort the body rather than end a valid-looking archive
+        logger.exception("Batch conversion failed mid-stream")
+        raise
+    finally:
+        # Left over only on failure or client disconnect
+        for _, txt_future in pending:
+            txt_future.cancel()
+    # Central directory is written on close
+    yield stream.drain()
+
 @router.post("/srt-to-txt/single")
 async def convert_single_file(file: UploadFile = File(...)):
     """Convert a single SRT file to TXT."""
@@ -41,8 +154,10 @@ async def convert_single_file(file: UploadFile = File(...)):
         return {"error": "File must be an SRT file"}
     
     content = await file.read()
-    srt_content = content.decode('utf-8')
-    txt_content = convert_srt_to_txt(srt_content)
+    # Charset sniffing is CPU-bound too, so keep it off the event loop
+    txt_content = await _submit_conversion(asyncio.get_running_loop(), content)
+    if txt_content is None:
+        return {"error": "Could not detect the text encoding of the file"}
     
     return Response(
         content=txt_content.encode('utf-8'),
@@ -53,25 +168,40 @@ async def convert_single_file(file: UploadFile = File(...)):
     )
 
 @router.post("/srt-to-txt/batch")
-async def convert_multiple_files(files: List[UploadFile] = File(...)):
+async def convert_multiple_files(files: list[UploadFile] = File(...)):
     """Convert multiple SRT files to TXT and return as ZIP."""
     if not all(file.filename.endswith('.srt') for file in files):
         return {"error": "All files must be SRT files"}
     
-    # Create ZIP file in memory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for file in files:
-            content = await file.read()
-            srt_content = content.decode('utf-8')
-            txt_content = convert_srt_to_txt(srt_content)
-            
-            output_filename = os.path.splitext(file.filename)[0] + '.txt'
-            zip_file.writestr(output_filename, txt_content)
+    contents = await asyncio.gather(*(file.read() for file in files))
     
-    zip_buffer.seek(0)
-    return Response(
-        content=zip_buffer.getvalue(),
+    # Decoding and conversion are pure CPU work, so spread the files across processes
+    loop = asyncio.get_running_loop()
+    pending = deque(
+        (
+            os.path.splitext(file.filename)[0] + '.txt',
+            _submit_conversion(loop, content),
+        )
+        for file, content in zip(files, contents, strict=True)
+    )
+    del contents
+    
+    # Fail before the 200 status goes out if the first conversion breaks
+    first_filename, first_future = pending.popleft()
+    try:
+        first_txt = await first_future
+    except Exception:
+        logger.exception("Batch conversion failed")
+        for _, txt_future in pending:
+            txt_future.cancel()
+        return {"error": "Could not convert the files"}
+    if first_txt is None:
+        for _, txt_future in pending:
+            txt_future.cancel()
+        return {"error": "Could not detect the text encoding of all files"}
+    
+    return StreamingResponse(
+        _stream_zip((first_filename, first_txt), pending),
         media_type='application/zip',
         headers={
             'Content-Disposition': 'attachment; filename="converted_files.zip"'
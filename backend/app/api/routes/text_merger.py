@@ -3,6 +3,8 @@ from fastapi.responses import PlainTextResponse
 from typing import List
 import io
 
+from app.utils import decode_text
+
 router = APIRouter(prefix="/text-merger", tags=["text-merger"])
 
 
@@ -24,11 +26,10 @@ async def merge_text_files(files: List[UploadFile] = File(...)) -> str:
             continue
             
         content = await file.read()
-        try:
-            text = content.decode('utf-8')
-            merged_content.append(text)
-        except UnicodeDecodeError:
-            # Skip files that can't be decoded as UTF-8
+        text = decode_text(content)
+        if text is None:
+            # Skip files that can't be decoded in any known encoding
             continue
+        merged_content.append(text)
             
     return '\n'.join(merged_content) 
@@ -33,8 +33,12 @@ async def health_check() -> bool:
 
 
 @router.get("/qdrant-health/")
-async def qdrant_health_check() -> bool:
-    """Check if Qdrant is accessible."""
+def qdrant_health_check() -> bool:
+    """
+    Check if Qdrant is accessible.
+    Kept sync so FastAPI runs the blocking client call in its thread pool
+    instead of stalling the event loop for up to QDRANT_TIMEOUT.
+    """
     try:
         client = get_qdrant_client()
         # Simple collection list call to check connection
@@ -1,3 +1,4 @@
+import os
 import secrets
 import warnings
 from typing import Annotated, Any, Literal
@@ -91,6 +92,10 @@ class Settings(BaseSettings):
     def emails_enabled(self) -> bool:
         return bool(self.SMTP_HOST and self.EMAILS_FROM_EMAIL)
 
+    # Each uvicorn worker (4 in the Dockerfile) starts its own conversion pool,
+    # so split the cores between them instead of giving every pool all of them
+    CONVERTER_POOL_WORKERS: int = max(1, (os.cpu_count() or 1) // 4)
+
     EMAIL_TEST_USER: EmailStr = "test@example.com"
     FIRST_SUPERUSER: EmailStr
     FIRST_SUPERUSER_PASSWORD: str
@@ -98,6 +103,11 @@ class Settings(BaseSettings):
     # Qdrant settings
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_API_KEY: str | None = None
+    QDRANT_TIMEOUT: int = 30
+    # gRPC is faster for bulk traffic but needs QDRANT_GRPC_PORT reachable too;
+    # docker-compose turns it on for the bundled Qdrant, REST-only setups keep it off
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
 
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
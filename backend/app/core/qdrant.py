@@ -1,7 +1,10 @@
+import threading
+
 from qdrant_client import QdrantClient
 from app.core.config import settings
 
 qdrant_client: QdrantClient | None = None
+_qdrant_client_lock = threading.Lock()
 
 
 def get_qdrant_client() -> QdrantClient:
@@ -11,8 +14,14 @@ def get_qdrant_client() -> QdrantClient:
     """
     global qdrant_client
     if qdrant_client is None:
-        qdrant_client = QdrantClient(
-            url=settings.QDRANT_URL,
-            api_key=settings.QDRANT_API_KEY,
-        )
+        # Sync callers such as /utils/qdrant-health/ run in FastAPI's thread pool; build the client only once
+        with _qdrant_client_lock:
+            if qdrant_client is None:
+                qdrant_client = QdrantClient(
+                    url=settings.QDRANT_URL,
+                    api_key=settings.QDRANT_API_KEY,
+                    timeout=settings.QDRANT_TIMEOUT,
+                    prefer_grpc=settings.QDRANT_PREFER_GRPC,
+                    grpc_port=settings.QDRANT_GRPC_PORT,
+                )
     return qdrant_client 
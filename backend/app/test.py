@@ -1,24 +1,30 @@
+import mmap
 import os
 import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# A stripped subtitle line that is neither an index number nor a timestamp
+_TEXT_LINE = re.compile(
+    r'^[^\S\n]*(?!\d+[^\S\n]*$|\d{2}:\d{2}:\d{2},\d{3} -->)(\S[^\n]*?)[^\S\n]*$',
+    re.MULTILINE,
+)
+
 def convert_srt_to_txt(srt_path, txt_path):
-    with open(srt_path, 'r', encoding='utf-8') as srt_file:
-        lines = srt_file.readlines()
+    with open(srt_path, 'rb') as srt_file:
+        # mmap refuses zero-length files
+        if os.fstat(srt_file.fileno()).st_size == 0:
+            srt_content = ''
+        else:
+            with mmap.mmap(srt_file.fileno(), 0, access=mmap.ACCESS_READ) as srt_map:
+                srt_content = srt_map[:].decode('utf-8')
+    # Raw bytes skip universal-newline translation, so normalize by hand
+    srt_content = srt_content.replace('\r\n', '\n').replace('\r', '\n')
 
-    output_lines = []
-    for line in lines:
-        # Remove timestamp lines and index numbers
-        if re.match(r'^\d+\s*$', line.strip()):
-            continue
-        if re.match(r'^\d{2}:\d{2}:\d{2},\d{3} -->', line.strip()):
-            continue
-        if line.strip() == '':
-            continue
-        output_lines.append(line.strip())
+    output_lines = _TEXT_LINE.findall(srt_content)
 
-    with open(txt_path, 'w', encoding='utf-8') as txt_file:
-        txt_file.write('\n'.join(output_lines))
+    Path(txt_path).write_bytes('\n'.join(output_lines).encode('utf-8'))
 
 
 def batch_convert_srt_to_txt(source_folder, output_folder):
@@ -30,14 +36,27 @@ def batch_convert_srt_to_txt(source_folder, output_folder):
 
     output_folder.mkdir(parents=True, exist_ok=True)
 
-    for srt_file in source_folder.rglob('*.srt'):
-        txt_filename = srt_file.stem + '.txt'
-        txt_output_path = output_folder / txt_filename
-        convert_srt_to_txt(srt_file, txt_output_path)
-        print(f'Converted: {srt_file} -> {txt_output_path}')
-
-# Example usage
-source = '/Users/jiasheng/Downloads/CS7646_Lectures/02_01_So_you_want_to_be_a_hedge_fund_manager_subtitles'
-output = '/Users/jiasheng/Downloads/CS7646_Lectures_txt'
-print(source, output)
-batch_convert_srt_to_txt(source, output)
+    srt_files = list(source_folder.rglob('*.srt'))
+    txt_output_paths = [output_folder / (srt_file.stem + '.txt') for srt_file in srt_files]
+    # Outputs are flat, so same-named files in different subfolders would race on one .txt
+    sources_by_output = defaultdict(list)
+    for srt_file, txt_output_path in zip(srt_files, txt_output_paths, strict=True):
+        sources_by_output[txt_output_path].append(srt_file)
+    collisions = {path: sources for path, sources in sources_by_output.items() if len(sources) > 1}
+    if collisions:
+        raise ValueError(f'Several SRT files map to the same output: {collisions}')
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for srt_file, txt_output_path, _ in zip(
+            srt_files,
+            txt_output_paths,
+            executor.map(convert_srt_to_txt, srt_files, txt_output_paths),
+            strict=True,
+        ):
+            print(f'Converted: {srt_file} -> {txt_output_path}')
+
+if __name__ == '__main__':
+    # Example usage
+    source = '/Users/jiasheng/Downloads/CS7646_Lectures/02_01_So_you_want_to_be_a_hedge_fund_manager_subtitles'
+    output = '/Users/jiasheng/Downloads/CS7646_Lectures_txt'
+    print(source, output)
+    batch_convert_srt_to_txt(source, output)
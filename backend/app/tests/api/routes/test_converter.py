@@ -1,11 +1,21 @@
 import pytest
 from fastapi.testclient import TestClient
+from app.core.config import settings
 from app.main import app
+from app.api.routes import converter
+import asyncio
 import io
+import os
 import zipfile
+from collections.abc import Callable, Generator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 client = TestClient(app)
 
+URL_SINGLE = f"{settings.API_V1_STR}/convert/srt-to-txt/single"
+URL_BATCH = f"{settings.API_V1_STR}/convert/srt-to-txt/batch"
+
 # Sample SRT content for testing
 SAMPLE_SRT = """1
 00:00:01,000 --> 00:00:04,000
@@ -25,63 +35,140 @@ EXPECTED_TXT = """Hello, this is the first subtitle.
 This is the second subtitle with multiple lines.
 And this is the third one!"""
 
-@pytest.fixture
-def srt_file():
-    """Create a sample SRT file for testing."""
-    return io.StringIO(SAMPLE_SRT)
+SAMPLE_SRT_BYTES = SAMPLE_SRT.encode()
+EXPECTED_TXT_BYTES = EXPECTED_TXT.encode()
+
+# (SRT upload bytes, expected TXT bytes) for each input shape the converter handles
+SRT_CORPUS = [
+    pytest.param(SAMPLE_SRT_BYTES, EXPECTED_TXT_BYTES, id="normal"),
+    pytest.param(b"", b"", id="empty"),
+    pytest.param(
+        """1
+00:00:01,000 --> 00:00:04,000
+Hello, こんにちは, 你好!
+
+2
+00:00:05,000 --> 00:00:08,000
+Special chars: áéíóú ñ
+""".encode(),
+        "Hello, こんにちは, 你好!\nSpecial chars: áéíóú ñ".encode(),
+        id="special-characters",
+    ),
+    pytest.param(
+        """1
+00:00:01,000 --> 00:00:04,000
+你好，世界！这是第一条字幕。
+""".encode("gb18030"),
+        "你好，世界！这是第一条字幕。".encode(),
+        id="non-utf8-encoding",
+    ),
+    pytest.param(
+        """1
+00:00:01,000 --> 00:00:04,000
+ça va? Très bien… déjà… señor
+
+2
+00:00:05,000 --> 00:00:08,000
+Straße, Zürich, naïve
+""".encode("cp1252"),
+        "ça va? Très bien… déjà… señor\nStraße, Zürich, naïve".encode(),
+        id="cp1252-encoding",
+    ),
+    pytest.param(
+        """1
+00:00:01,000 --> 00:00:04,000
+Zażółć gęślą jaźń…
+
+2
+00:00:05,000 --> 00:00:08,000
+Dzień dobry, jak się masz?
+""".encode("cp1250"),
+        "Zażółć gęślą jaźń…\nDzień dobry, jak się masz?".encode(),
+        id="cp1250-encoding",
+    ),
+    pytest.param(
+        """1
+00:00:01,000 --> 00:00:04,000
+Günaydın, nasılsınız?
+
+2
+00:00:05,000 --> 00:00:08,000
+Bugün hava çok güzel, değil mi?
+""".encode("cp1254"),
+        "Günaydın, nasılsınız?\nBugün hava çok güzel, değil mi?".encode(),
+        id="cp1254-encoding",
+    ),
+    pytest.param(
+        """1
+00:00:01,000 --> 00:00:04,000
+Hello, こんにちは, 你好!
+""".encode("utf-16"),
+        "Hello, こんにちは, 你好!".encode(),
+        id="utf16-bom-encoding",
+    ),
+    pytest.param(
+        b"""Not a proper SRT format
+This is just plain text
+Without timestamps or numbers""",
+        b"Not a proper SRT format This is just plain text Without timestamps or numbers",
+        id="malformed",
+    ),
+]
+
+def read_zip_members(content: bytes) -> dict[str, bytes]:
+    """Read every member of a ZIP archive in a single pass."""
+    with zipfile.ZipFile(io.BytesIO(content)) as zip_file:
+        return {info.filename: zip_file.read(info) for info in zip_file.infolist()}
 
 @pytest.fixture
 def multiple_srt_files():
     """Create multiple sample SRT files for testing."""
     files = [
-        ("files", ("test1.srt", SAMPLE_SRT.encode(), "text/plain")),
-        ("files", ("test2.srt", SAMPLE_SRT.encode(), "text/plain"))
+        ("files", ("test1.srt", SAMPLE_SRT_BYTES, "text/plain")),
+        ("files", ("test2.srt", SAMPLE_SRT_BYTES, "text/plain"))
     ]
     return files
 
-def test_convert_single_file_success(srt_file):
+def test_convert_single_file_success():
     """Test successful conversion of a single SRT file."""
-    files = {"file": ("test.srt", srt_file.getvalue().encode(), "text/plain")}
-    response = client.post("/api/v1/convert/srt-to-txt/single", files=files)
+    files = {"file": ("test.srt", SAMPLE_SRT_BYTES, "text/plain")}
+    response = client.post(URL_SINGLE, files=files)
     
     assert response.status_code == 200
     assert response.headers["content-type"] == "text/plain; charset=utf-8"
     assert response.headers["content-disposition"] == 'attachment; filename="test.txt"'
     
-    # Compare content (ignoring whitespace at the end of lines)
-    received_lines = response.content.decode().strip().split('\n')
-    expected_lines = EXPECTED_TXT.strip().split('\n')
-    assert received_lines == expected_lines
+    assert response.content == EXPECTED_TXT_BYTES
 
 def test_convert_single_file_wrong_extension():
     """Test error handling when uploading a non-SRT file."""
     files = {"file": ("test.txt", b"Some content", "text/plain")}
-    response = client.post("/api/v1/convert/srt-to-txt/single", files=files)
+    response = client.post(URL_SINGLE, files=files)
     
     assert response.status_code == 200  # FastAPI returns 200 with error message
     assert response.json() == {"error": "File must be an SRT file"}
 
+def test_convert_single_file_ambiguous_encoding() -> None:
+    """Test that content too short to sniff is reported instead of guessed."""
+    files = {"file": ("test.srt", b"caf\xe9", "text/plain")}
+    response = client.post(URL_SINGLE, files=files)
+    
+    assert response.status_code == 200
+    assert response.json() == {"error": "Could not detect the text encoding of the file"}
+
 def test_convert_batch_success(multiple_srt_files):
     """Test successful batch conversion of multiple SRT files."""
-    response = client.post("/api/v1/convert/srt-to-txt/batch", files=multiple_srt_files)
+    response = client.post(URL_BATCH, files=multiple_srt_files)
     
     assert response.status_code == 200
     assert response.headers["content-type"] == "application/zip"
     assert response.headers["content-disposition"] == 'attachment; filename="converted_files.zip"'
     
     # Check ZIP contents
-    zip_data = io.BytesIO(response.content)
-    with zipfile.ZipFile(zip_data) as zip_file:
-        # Verify number of files
-        assert len(zip_file.namelist()) == 2
-        
-        # Verify content of each file
-        for filename in zip_file.namelist():
-            assert filename.endswith('.txt')
-            content = zip_file.read(filename).decode('utf-8').strip()
-            expected_lines = EXPECTED_TXT.strip().split('\n')
-            received_lines = content.split('\n')
-            assert received_lines == expected_lines
+    assert read_zip_members(response.content) == {
+        "test1.txt": EXPECTED_TXT_BYTES,
+        "test2.txt": EXPECTED_TXT_BYTES,
+    }
 
 def test_convert_batch_wrong_extension():
     """Test error handling when uploading non-SRT files in batch."""
@@ -89,63 +176,107 @@ def test_convert_batch_wrong_extension():
         ("files", ("test1.txt", b"Some content", "text/plain")),
         ("files", ("test2.txt", b"More content", "text/plain"))
     ]
-    response = client.post("/api/v1/convert/srt-to-txt/batch", files=files)
+    response = client.post(URL_BATCH, files=files)
     
     assert response.status_code == 200  # FastAPI returns 200 with error message
     assert response.json() == {"error": "All files must be SRT files"}
 
-def test_convert_single_file_empty():
-    """Test handling of empty SRT file."""
-    files = {"file": ("test.srt", b"", "text/plain")}
-    response = client.post("/api/v1/convert/srt-to-txt/single", files=files)
+@pytest.mark.parametrize(
+    ("content", "expected"),
+    SRT_CORPUS,
+)
+def test_convert_single_file_content(content: bytes, expected: bytes) -> None:
+    """Test conversion output for each SRT shape in the corpus."""
+    files = {"file": ("test.srt", content, "text/plain")}
+    response = client.post(URL_SINGLE, files=files)
     
     assert response.status_code == 200
-    assert response.content.decode().strip() == ""
+    assert response.content == expected
 
-def test_convert_single_file_special_characters():
-    """Test handling of special characters in SRT file."""
-    srt_content = """1
-00:00:01,000 --> 00:00:04,000
-Hello, こんにちは, 你好!
-
-2
-00:00:05,000 --> 00:00:08,000
-Special chars: áéíóú ñ
-"""
-    files = {"file": ("test.srt", srt_content.encode('utf-8'), "text/plain")}
-    response = client.post("/api/v1/convert/srt-to-txt/single", files=files)
+def test_convert_batch_single_file():
+    """Test batch conversion with single file."""
+    files = [("files", ("test1.srt", SAMPLE_SRT_BYTES, "text/plain"))]
+    response = client.post(URL_BATCH, files=files)
     
     assert response.status_code == 200
-    content = response.content.decode('utf-8').strip()
-    expected = "Hello, こんにちは, 你好!\nSpecial chars: áéíóú ñ"
-    assert content == expected
+    assert response.headers["content-type"] == "application/zip"
+    
+    assert read_zip_members(response.content) == {"test1.txt": EXPECTED_TXT_BYTES}
 
-def test_convert_single_file_malformed_srt():
-    """Test handling of malformed SRT file."""
-    malformed_srt = """Not a proper SRT format
-This is just plain text
-Without timestamps or numbers"""
+@pytest.fixture
+def cpu_pool(monkeypatch: pytest.MonkeyPatch) -> Generator[ProcessPoolExecutor, None, None]:
+    """Give the test its own conversion pool, leaving any shared one untouched."""
+    monkeypatch.setattr(converter, "_cpu_pool", None)
+    yield converter.start_cpu_pool()
+    converter.shutdown_cpu_pool()
+
+
+def test_convert_batch_recovers_from_broken_pool(cpu_pool: ProcessPoolExecutor) -> None:
+    """Test that a crashed conversion worker does not break later batches."""
+    with pytest.raises(BrokenProcessPool):
+        cpu_pool.submit(os._exit, 1).result()
     
-    files = {"file": ("test.srt", malformed_srt.encode(), "text/plain")}
-    response = client.post("/api/v1/convert/srt-to-txt/single", files=files)
+    files = [("files", ("test1.srt", SAMPLE_SRT_BYTES, "text/plain"))]
+    response = client.post(URL_BATCH, files=files)
     
     assert response.status_code == 200
-    content = response.content.decode().strip()
-    expected = "Not a proper SRT format This is just plain text Without timestamps or numbers"
-    assert content == expected
+    assert read_zip_members(response.content) == {"test1.txt": EXPECTED_TXT_BYTES}
 
-def test_convert_batch_single_file():
-    """Test batch conversion with single file."""
-    files = [("files", ("test1.srt", SAMPLE_SRT.encode(), "text/plain"))]
-    response = client.post("/api/v1/convert/srt-to-txt/batch", files=files)
+
+def _fail_conversion_of(
+    failing_content: bytes,
+) -> Callable[[asyncio.AbstractEventLoop, bytes], asyncio.Future[str | None]]:
+    """Build a _submit_conversion stand-in whose future fails for one input."""
+    def submit(loop: asyncio.AbstractEventLoop, content: bytes) -> asyncio.Future[str | None]:
+        future: asyncio.Future[str | None] = loop.create_future()
+        if content == failing_content:
+            future.set_exception(RuntimeError("conversion failed"))
+        else:
+            future.set_result(converter._decode_and_convert(content))
+        return future
+    return submit
+
+
+def test_convert_batch_first_file_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a failure before streaming starts returns an error, not a ZIP."""
+    monkeypatch.setattr(converter, "_submit_conversion", _fail_conversion_of(SAMPLE_SRT_BYTES))
+    files = [("files", ("test1.srt", SAMPLE_SRT_BYTES, "text/plain"))]
+    response = client.post(URL_BATCH, files=files)
     
     assert response.status_code == 200
-    assert response.headers["content-type"] == "application/zip"
+    assert response.json() == {"error": "Could not convert the files"}
+
+
+def test_convert_batch_later_file_fails_aborts_stream(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a failure mid-stream aborts the response instead of closing the archive."""
+    monkeypatch.setattr(converter, "_submit_conversion", _fail_conversion_of(b"broken"))
+    files = [
+        ("files", ("test1.srt", SAMPLE_SRT_BYTES, "text/plain")),
+        ("files", ("test2.srt", b"broken", "text/plain")),
+    ]
+    
+    with pytest.raises(RuntimeError, match="conversion failed"):
+        client.post(URL_BATCH, files=files)
+
+
+def test_convert_batch_undecodable_first_file() -> None:
+    """Test that an undetectable encoding in the first file returns an error, not a ZIP."""
+    files = [
+        ("files", ("test1.srt", b"caf\xe9", "text/plain")),
+        ("files", ("test2.srt", SAMPLE_SRT_BYTES, "text/plain")),
+    ]
+    response = client.post(URL_BATCH, files=files)
+    
+    assert response.status_code == 200
+    assert response.json() == {"error": "Could not detect the text encoding of all files"}
+
+
+def test_convert_batch_undecodable_later_file_aborts_stream() -> None:
+    """Test that an undetectable encoding after streaming starts aborts the response."""
+    files = [
+        ("files", ("test1.srt", SAMPLE_SRT_BYTES, "text/plain")),
+        ("files", ("test2.srt", b"caf\xe9", "text/plain")),
+    ]
     
-    zip_data = io.BytesIO(response.content)
-    with zipfile.ZipFile(zip_data) as zip_file:
-        assert len(zip_file.namelist()) == 1
-        content = zip_file.read(zip_file.namelist()[0]).decode('utf-8').strip()
-        expected_lines = EXPECTED_TXT.strip().split('\n')
-        received_lines = content.split('\n')
-        assert received_lines == expected_lines 
+    with pytest.raises(ValueError, match="test2.txt"):
+        client.post(URL_BATCH, files=files)
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+URL_MERGE = f"{settings.API_V1_STR}/text-merger/merge/"
+
+
+def test_merge_text_files_success() -> None:
+    """Test merging UTF-8 and legacy-encoded text files in upload order."""
+    files = [
+        ("files", ("first.txt", "Première ligne".encode(), "text/plain")),
+        ("files", ("second.txt", "Très bien… déjà vu".encode("cp1252"), "text/plain")),
+    ]
+    response = client.post(URL_MERGE, files=files)
+
+    assert response.status_code == 200
+    assert response.text == "Première ligne\nTrès bien… déjà vu"
+
+
+def test_merge_text_files_skips_undecodable() -> None:
+    """Test that files which are not text in any known encoding are skipped."""
+    files = [
+        ("files", ("text.txt", b"Plain text", "text/plain")),
+        ("files", ("binary.txt", bytes(range(256)) * 3, "text/plain")),
+    ]
+    response = client.post(URL_MERGE, files=files)
+
+    assert response.status_code == 200
+    assert response.text == "Plain text"
+
+
+def test_merge_text_files_skips_non_text_content_type() -> None:
+    """Test that uploads without a text/* content type are skipped."""
+    files = [
+        ("files", ("text.txt", b"Plain text", "text/plain")),
+        ("files", ("data.bin", b"Other text", "application/octet-stream")),
+    ]
+    response = client.post(URL_MERGE, files=files)
+
+    assert response.status_code == 200
+    assert response.text == "Plain text"
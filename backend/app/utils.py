@@ -6,6 +6,8 @@ from typing import Any
 
 import emails  # type: ignore
 import jwt
+from charset_normalizer import from_bytes
+from charset_normalizer.utils import is_multi_byte_encoding
 from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
 
@@ -121,3 +123,75 @@ def verify_password_reset_token(token: str) -> str | None:
         return str(decoded_token["sub"])
     except InvalidTokenError:
         return None
+
+
+# Latin code pages that Western European text is routinely ranked as
+_CP1252_CONFUSABLES = frozenset(
+    {
+        "cp1250",
+        "cp1252",
+        "cp1254",
+        "cp1257",
+        "cp775",
+        "cp850",
+        "cp852",
+        "hp_roman8",
+        "iso8859_2",
+        "iso8859_3",
+        "iso8859_4",
+        "iso8859_9",
+        "iso8859_10",
+        "iso8859_13",
+        "iso8859_14",
+        "iso8859_15",
+        "iso8859_16",
+        "latin_1",
+        "mac_iceland",
+        "mac_latin2",
+        "mac_roman",
+        "mac_turkish",
+    }
+)
+
+
+def decode_text(content: bytes) -> str | None:
+    """
+    Decode uploaded text, sniffing the charset only when it is not UTF-8.
+    Returns None if the content does not look like text in any known encoding,
+    or if the candidates are too close to call.
+    """
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    matches = [
+        match
+        for match in from_bytes(content)
+        # Without a BOM, UTF-16/32 "decodes" any even-length byte string
+        if match.bom or not match.encoding.startswith(("utf_16", "utf_32"))
+    ]
+    if not matches:
+        return None
+    best_match = matches[0]
+    if not best_match.coherence and is_multi_byte_encoding(best_match.encoding):
+        # CJK code pages sniff as each other; prefer one that reads as a language
+        best_match = max(
+            (match for match in matches if is_multi_byte_encoding(match.encoding)),
+            key=lambda match: match.coherence,
+        )
+    # The mess detector scores Western European text worse in cp1252 than in
+    # cp1250/cp1257; pick cp1252 only when it reads as the same language
+    if best_match.encoding in _CP1252_CONFUSABLES and any(
+        "cp1252" in match.could_be_from_charset
+        and match.coherence >= best_match.coherence
+        for match in matches
+    ):
+        return content.decode("cp1252", errors="replace")
+    # No language evidence and an equally clean reading that differs: guessing
+    # would only return mojibake
+    if not best_match.coherence and any(
+        match.chaos == best_match.chaos and str(match) != str(best_match)
+        for match in matches
+    ):
+        return None
+    return str(best_match)